@@ -22,6 +22,9 @@ def main(qlcfile, cuefile):
     CUES = collections.OrderedDict()
     COLLECTIONS = []
 
+    # Tags the generated functions with the cue file they came from (Used by CleanWorkspace.py)
+    cuelistname = os.path.splitext(os.path.basename(cuefile))[0]
+
     SCRIPTPATH = os.path.dirname(os.path.realpath(__file__))
     CSVPATH = os.path.join(SCRIPTPATH, cuefile)
 
@@ -132,6 +135,7 @@ def main(qlcfile, cuefile):
         Collection.set("ID", ""+str(collection['id'])+"")
         Collection.set("Type", "Collection")
         Collection.set("Name", collection['name'] + " (Auto Generated)")
+        Collection.set("Path", cuelistname)
         STEPCOUNT = 0
         for function in collection['functions']:
             CollectionStep = ElementTree.SubElement(Collection, "Step")
@@ -156,7 +160,7 @@ def main(qlcfile, cuefile):
         step['functionid'] = CUES[cue]['functionid']
         steps.append(step)   
         STEPCOUNT += 1        
-    qlcsf.createFunction(parent=XML_Root, id=qlcsf.generateFunctionId(), type="Chaser", name="Master Cue List (Auto Generated)", speed=speed, direction="Forward", runorder="Loop", speedmodes=speedmodes, steps=steps)    
+    qlcsf.createFunction(parent=XML_Root, id=qlcsf.generateFunctionId(), type="Chaser", name="Master Cue List (Auto Generated)", path=cuelistname, speed=speed, direction="Forward", runorder="Loop", speedmodes=speedmodes, steps=steps)    
 
     XML_Root.insert(9999999, ElementTree.Comment(' END OF AUTO GENERATED XML FROM QLCPYTHONSCRIPTS (DO NOT COPY ROOT ELEMENT BELOW) '))
 
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os, shutil, sys, click
+import QLCScriptFunctions as qlcsf
+
+@click.command()
+@click.option('--qlcfile', help='Location of the QLC .qxw file', required=True)
+@click.option('--outputfile', help='Location to write the cleaned QLC .qxw file (Defaults to overwriting --qlcfile, after backing it up to <qlcfile>.bak)')
+@click.option('--keep', help='ID of the show / master cue list generation to keep, Other generations of it are removed (Can be used multiple times)', type=int, multiple=True)
+@click.option('--dryrun', help='Only report the auto generated functions that would be removed', is_flag=True)
+def main(qlcfile, outputfile, keep, dryrun):
+    if not os.path.isfile(qlcfile):
+        raise Exception("Unable to open QLC file '"+qlcfile+"'")
+
+    with open(qlcfile) as f:
+        qlcsf.init(f.read())
+
+    FUNCTIONS = qlcsf.extractEngineFunctions()
+    GENERATEDIDS = qlcsf.findGeneratedFunctionIds(FUNCTIONS)
+    GENERATIONS = qlcsf.findGenerations(FUNCTIONS, GENERATEDIDS)
+    REPLACEDIDS = qlcsf.findReplacedGenerations(GENERATIONS, keep)
+    STALEFUNCTIONS = qlcsf.findStaleFunctions(FUNCTIONS, GENERATEDIDS, REPLACEDIDS)
+    VIRTUALCONSOLEIDS = set(qlcsf.findVirtualConsoleReferences())
+
+    UNRESOLVED = []
+    print("Auto generated shows / master cue lists")
+    for (functionType, name), generations in GENERATIONS.items():
+        print(functionType+" - "+(name or "(No cue file recorded)"))
+        for function in generations:
+            if int(function.attrib['ID']) in REPLACEDIDS:
+                status = "Remove (Replaced by --keep)"
+                if int(function.attrib['ID']) in VIRTUALCONSOLEIDS:
+                    status += " - Still bound in the Virtual Console, Rebind it to the kept generation"
+            elif int(function.attrib['ID']) in keep:
+                status = "Keep (--keep)"
+            else:
+                status = "Keep"
+            print("    [ID: "+function.attrib['ID']+"] "+status)
+        # Cue lists generated before they were tagged with their cue file may have been replaced by a tagged one
+        if functionType == "Cue List" and not name and any(key[0] == "Cue List" and key[1] for key in GENERATIONS):
+            generations = generations + [function for key in GENERATIONS if key[0] == "Cue List" and key[1] for function in GENERATIONS[key]]
+        if len(generations) > 1 and not any(int(function.attrib['ID']) in keep or int(function.attrib['ID']) in REPLACEDIDS for function in generations):
+            UNRESOLVED.append(functionType+" - "+(name or "(No cue file recorded)"))
+            print("    Multiple generations found - Use --keep <ID> to choose which one to keep")
+
+    if UNRESOLVED:
+        print()
+        print(str(len(UNRESOLVED))+" show(s) / cue list(s) have multiple generations and none was chosen with --keep")
+        print("Every generation of these is kept, Only functions nothing uses will be removed")
+
+    print()
+    if not STALEFUNCTIONS:
+        print("No stale auto generated functions found")
+        if UNRESOLVED:
+            sys.exit(1)
+        return
+
+    print("Stale auto generated functions ("+str(len(STALEFUNCTIONS))+")")
+    for function in STALEFUNCTIONS:
+        if 'Path' in function.attrib:
+            print("[ID: "+function.attrib['ID']+"] "+function.attrib['Type']+" - "+function.attrib['Path']+"/"+function.attrib['Name'])
+        else:
+            print("[ID: "+function.attrib['ID']+"] "+function.attrib['Type']+" - "+function.attrib['Name'])
+
+    if dryrun:
+        print()
+        print("Dry run - Nothing removed")
+        return
+
+    qlcsf.removeFunctions(STALEFUNCTIONS)
+
+    if not outputfile:
+        outputfile = qlcfile
+    if os.path.abspath(outputfile) == os.path.abspath(qlcfile):
+        shutil.copyfile(qlcfile, qlcfile + ".bak")
+        print()
+        print("Backed up '"+qlcfile+"' to '"+qlcfile+".bak'")
+    qlcsf.outputWorkspace(outputfile)
+
+    print()
+    print("Removed "+str(len(STALEFUNCTIONS))+" functions, Written to '"+outputfile+"'")
+
+if __name__ == "__main__":
+    main() # pylint: disable=no-value-for-parameter
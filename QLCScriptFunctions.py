@@ -2,14 +2,17 @@ import xml.etree.ElementTree as ElementTree
 from itertools import count, filterfalse
 from mutagen.mp3 import MP3
 import xml.dom.minidom as minidom
-import re, os
+import collections, re, os
 
 QLCXML = None
+QLCNAMESPACE = None
 INUSEFUNCTIONIDS = None
 
 def init(qlcxml):
-    global QLCXML, INUSEFUNCTIONIDS
+    global QLCXML, QLCNAMESPACE, INUSEFUNCTIONIDS
 
+    namespace = re.search(r'\sxmlns="([^"]+)"', qlcxml)
+    QLCNAMESPACE = namespace.group(1) if namespace else None
     QLCXML = ElementTree.fromstring(re.sub(r'\sxmlns="[^"]+"', '', qlcxml, count=1))
     INUSEFUNCTIONIDS = findInUseFunctionIds()
 
@@ -110,7 +113,201 @@ def generateFunctionId():
     INUSEFUNCTIONIDS.append(nextAvaliableId)
     
     return nextAvaliableId
-    
+
+def findFunctionReferences(function):
+    references = []
+
+    # Show tracks (ShowFunction IDs, and the scene a track is bound to)
+    for track in function.findall("Track"):
+        if 'SceneID' in track.attrib:
+            references.append(int(track.attrib['SceneID']))
+        for showFunction in track.findall("ShowFunction"):
+            if 'ID' in showFunction.attrib:
+                references.append(int(showFunction.attrib['ID']))
+
+    # Chaser / Collection / Sequence steps
+    for step in function.findall("Step"):
+        if step.text and step.text.strip().isdigit():
+            references.append(int(step.text.strip()))
+
+    if 'BoundScene' in function.attrib:
+        references.append(int(function.attrib['BoundScene']))
+
+    # Scripts can start/stop other functions
+    for command in function.findall("Command"):
+        if command.text:
+            for functionId in re.findall(r'(?:start|stop)function:(\d+)', command.text):
+                references.append(int(functionId))
+
+    return references
+
+def findVirtualConsoleReferences():
+    references = []
+
+    virtualConsole = extractFromQLC("./VirtualConsole")
+    if virtualConsole is False:
+        return references
+
+    for element in virtualConsole.iter():
+        # Clock schedules, audio triggers etc
+        for attribute in ['Function', 'FunctionID']:
+            if element.attrib.get(attribute, "").isdigit():
+                references.append(int(element.attrib[attribute]))
+
+        if element.tag == "Function":
+            if element.attrib.get('ID', "").isdigit():
+                references.append(int(element.attrib['ID']))
+            elif element.text and element.text.strip().isdigit():
+                references.append(int(element.text.strip()))
+        elif element.tag == "CueList":
+            chaser = element.find("Chaser")
+            if chaser is not None and chaser.text and chaser.text.strip().isdigit():
+                references.append(int(chaser.text.strip()))
+
+    return references
+
+def isShowWrapper(function, functionsById, showNames):
+    # CSVtoShow.py wraps each chaser / scene used in a show in a single step Chaser / Sequence
+    # named '<function> <N>', filed under the show name
+    if function.attrib['Type'] not in ("Chaser", "Sequence") or function.attrib.get('Path') not in showNames:
+        return False
+
+    name = re.match(r'(.+) \d+$', function.attrib['Name'])
+    steps = function.findall("Step")
+    if not name or len(steps) != 1:
+        return False
+
+    if function.attrib['Type'] == "Sequence":
+        originalId = function.attrib.get('BoundScene', "")
+        originalType = "Scene"
+    else:
+        originalId = steps[0].text.strip() if steps[0].text else ""
+        originalType = "Chaser"
+
+    if not originalId.isdigit() or int(originalId) not in functionsById:
+        return False
+    original = functionsById[int(originalId)]
+
+    return original.attrib['Type'] == originalType and original.attrib['Name'] == name.group(1)
+
+def isCueListFunction(function):
+    # CSVtoCueList.py output
+    if function.attrib['Type'] == "Collection":
+        return function.attrib['Name'].endswith(" (Auto Generated)")
+    return function.attrib['Type'] == "Chaser" and function.attrib['Name'] == "Master Cue List (Auto Generated)"
+
+def extractEngineFunctions():
+    functions = extractFromQLC(".//Engine/Function", True)
+
+    if not functions:
+        raise Exception("No functions found in QLC")
+
+    for function in functions:
+        if not all(x in function.attrib for x in ['ID', 'Name', 'Type']):
+            functionasstring = ElementTree.tostring(function, encoding='utf8').decode('utf-8')
+            raise Exception("'"+functionasstring+"' missing 'ID', 'Name' or 'Type' attributes, That doesn't sound right?")
+
+    return functions
+
+def findGeneratedFunctionIds(functions):
+    functionsById = dict((int(function.attrib['ID']), function) for function in functions)
+    showNames = set(function.attrib['Name'] for function in functions if function.attrib['Type'] == "Show")
+
+    generatedIds = set()
+    wrappedShowNames = set()
+    for function in functions:
+        if isCueListFunction(function):
+            generatedIds.add(int(function.attrib['ID']))
+        elif isShowWrapper(function, functionsById, showNames):
+            generatedIds.add(int(function.attrib['ID']))
+            wrappedShowNames.add(function.attrib['Path'])
+
+    # Only shows that CSVtoShow.py has generated wrappers for are treated as generated
+    for function in functions:
+        if function.attrib['Type'] == "Show" and function.attrib['Name'] in wrappedShowNames:
+            generatedIds.add(int(function.attrib['ID']))
+
+    return generatedIds
+
+def findGenerations(functions, generatedIds):
+    # Every generation of a generated show (by name) or master cue list (by the cue file
+    # it came from, stored in Path - Cue lists generated before Path was set have no cue file)
+    generations = collections.OrderedDict()
+    for function in functions:
+        if int(function.attrib['ID']) not in generatedIds:
+            continue
+
+        if function.attrib['Type'] == "Show":
+            key = ("Show", function.attrib['Name'])
+        elif function.attrib['Name'] == "Master Cue List (Auto Generated)":
+            key = ("Cue List", function.attrib.get('Path', ""))
+        else:
+            continue
+
+        if key not in generations:
+            generations[key] = []
+        generations[key].append(function)
+
+    return generations
+
+def findReplacedGenerations(generations, keepIds):
+    keepIds = set(int(functionId) for functionId in keepIds)
+    generationIds = set(int(function.attrib['ID']) for key in generations for function in generations[key])
+    for functionId in keepIds:
+        if functionId not in generationIds:
+            raise Exception("Function ID '"+str(functionId)+"' is not an auto generated show or master cue list")
+
+    replacedKeys = [key for key in generations if any(int(function.attrib['ID']) in keepIds for function in generations[key])]
+
+    # Keeping a cue list tagged with its cue file also replaces the cue lists generated before
+    # they were tagged, so existing workspaces can be upgraded
+    if ("Cue List", "") in generations and any(key[0] == "Cue List" and key[1] for key in replacedKeys):
+        if ("Cue List", "") not in replacedKeys:
+            replacedKeys.append(("Cue List", ""))
+
+    replacedIds = set()
+    for key in replacedKeys:
+        for function in generations[key]:
+            if int(function.attrib['ID']) not in keepIds:
+                replacedIds.add(int(function.attrib['ID']))
+
+    return replacedIds
+
+def findStaleFunctions(functions, generatedIds, replacedIds):
+    graph = {}
+    # A replaced generation goes even if the Virtual Console is still bound to it
+    roots = [functionId for functionId in findVirtualConsoleReferences() if functionId not in replacedIds]
+
+    for function in functions:
+        functionId = int(function.attrib['ID'])
+        graph[functionId] = findFunctionReferences(function)
+
+        if functionId not in generatedIds:
+            roots.append(functionId)
+        elif (function.attrib['Type'] == "Show" or function.attrib['Name'] == "Master Cue List (Auto Generated)") and functionId not in replacedIds:
+            # Every generation is kept unless another one has been chosen with --keep
+            roots.append(functionId)
+
+    # Mark
+    reachable = set()
+    pending = [functionId for functionId in roots if functionId in graph]
+    while pending:
+        functionId = pending.pop()
+        if functionId in reachable:
+            continue
+        reachable.add(functionId)
+        pending.extend(reference for reference in graph[functionId] if reference in graph and reference not in reachable)
+
+    return [function for function in functions if int(function.attrib['ID']) not in reachable]
+
+# Removed IDs are handed out again by generateFunctionId() once a script re-reads the cleaned .qxw file
+def removeFunctions(functions):
+    engine = extractFromQLC("./Engine")
+    staleIds = set(int(function.attrib['ID']) for function in functions)
+
+    # Sweep
+    engine[:] = [element for element in engine if element.tag != "Function" or int(element.attrib['ID']) not in staleIds]
+
 # I'm sure this is wrong... But it seems to work for what we're doing here!
 def timecodeToMS(timecode):
     pattern = re.compile("\d\d:\d\d.\d\d\d$")
@@ -185,6 +382,18 @@ def createFunction(parent,id,type,name,speed,direction,runorder,speedmodes,path=
     
     return Function
     
+def outputWorkspace(path):
+    if QLCNAMESPACE:
+        QLCXML.set("xmlns", QLCNAMESPACE)
+    xmlstring = ElementTree.tostring(QLCXML, encoding='unicode')
+    if QLCNAMESPACE:
+        del QLCXML.attrib["xmlns"]
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE Workspace>\n')
+        f.write(xmlstring)
+        f.write('\n')
+
 def outputData(xmlstring,pretty=False,standard=True):
     parsed = minidom.parseString(xmlstring)
 